@@ -0,0 +1,13 @@
+#!/bin/sh
+set -e
+
+# With CUDA_MPS=1 every CUDA process in the container shares one MPS server,
+# so kernels from separate worker processes run concurrently instead of time-slicing
+if [ "${CUDA_MPS:-0}" = "1" ]; then
+    export CUDA_MPS_PIPE_DIRECTORY="${CUDA_MPS_PIPE_DIRECTORY:-/tmp/nvidia-mps}"
+    export CUDA_MPS_LOG_DIRECTORY="${CUDA_MPS_LOG_DIRECTORY:-/tmp/nvidia-log}"
+    mkdir -p "$CUDA_MPS_PIPE_DIRECTORY" "$CUDA_MPS_LOG_DIRECTORY"
+    nvidia-cuda-mps-control -d
+fi
+
+exec "$@"
@@ -1,4 +1,13 @@
+import os
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run("src.main:app", host="0.0.0.0", port=9000, reload=True)
\ No newline at end of file
+    # Auto-reload only supports a single worker, so it is opt-in with DEV=1
+    reload = os.getenv("DEV") == "1"
+    uvicorn.run(
+        "src.main:app",
+        host="0.0.0.0",
+        port=9000,
+        reload=reload,
+        workers=None if reload else int(os.getenv("WEB_CONCURRENCY", os.cpu_count()))
+    )
\ No newline at end of file
@@ -6,12 +6,13 @@ setup(
     packages=find_packages(where="src"),
     package_dir={"": "src"},
     install_requires=[
-        "fastapi",
+        "fastapi>=0.100",
+        "pydantic>=2",
         "uvicorn",
         "sqlalchemy",
         "python-jose[cryptography]",
         "passlib[bcrypt]",
         "python-multipart",
     ],
-    python_requires=">=3.7",
+    python_requires=">=3.8",
 )
\ No newline at end of file
@@ -1,22 +1,32 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, BackgroundTasks, status, Response
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, status
 from fastapi.security import OAuth2PasswordBearer
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+import asyncio
+import csv
+import os
+import tempfile
 import uvicorn
-import uuid
+import secrets
+from typing import Callable, TextIO
 
 from .models.database import get_db, Conversation
-from src.services.auth import get_current_user
+from src.services.auth import get_current_user, get_current_username
 from .services.audio_processing import process_audio_file
-from .services.transcription import transcribe_audio
-from .services.classification import classify_dialogue
-from .services.speaker_identification import SpeakerIdentifier
 from .services.progress import progress_tracker
 from .services.search import SearchService
-from .schemas.conversation import ConversationCreate, ConversationResponse
+from .schemas.conversation import ConversationResponse
+from .tasks import transcribe_and_analyze
 
-app = FastAPI(title="Sales Conversation Analysis System")
+ALLOWED_CONTENT_TYPES = frozenset({"audio/wav", "audio/mp3", "audio/m4a"})
+
+app = FastAPI(
+    title="Sales Conversation Analysis System",
+    default_response_class=ORJSONResponse
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # CORS middleware for web interface
@@ -28,24 +38,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-speaker_identifier = SpeakerIdentifier()
-
 @app.post("/upload/single", response_model=ConversationResponse)
 async def upload_single_audio(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user = Depends(get_current_user)
 ):
     """
     Upload and process a single audio file for transcription and analysis.
     """
     # Validate file
-    if file.content_type not in ["audio/wav", "audio/mp3", "audio/m4a"]:
+    if file.content_type not in ALLOWED_CONTENT_TYPES:
         raise HTTPException(status_code=400, detail="Invalid file format")
     
     # Generate task ID for progress tracking
-    task_id = str(uuid.uuid4())
+    task_id = secrets.token_hex(16)
     progress_tracker.create_task(task_id)
     
     try:
@@ -54,15 +60,9 @@ async def upload_single_audio(
         file_path = await process_audio_file(file)
         
         # Add to processing queue
-        background_tasks.add_task(
-            transcribe_and_analyze,
-            file_path,
-            db,
-            current_user.id,
-            task_id
-        )
+        transcribe_and_analyze.delay(file_path, current_user.id, task_id)
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_202_ACCEPTED,
             content={
                 "message": "File uploaded successfully, processing started",
@@ -75,10 +75,8 @@ async def upload_single_audio(
 
 @app.post("/upload/batch", response_model=list[ConversationResponse])
 async def upload_batch_audio(
-    background_tasks: BackgroundTasks,
     files: list[UploadFile] = File(...),
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user = Depends(get_current_user)
 ):
     """
     Upload and process multiple audio files for transcription and analysis.
@@ -86,34 +84,37 @@ async def upload_batch_audio(
     if len(files) > 10:  # Limit batch size
         raise HTTPException(status_code=400, detail="Maximum 10 files per batch")
     
+    # Reject the whole batch up front, listing every invalid file
+    invalid_files = [file.filename for file in files if file.content_type not in ALLOWED_CONTENT_TYPES]
+    if invalid_files:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Invalid file format", "invalid": invalid_files}
+        )
+    
     task_ids = []
     for file in files:
-        if file.content_type not in ["audio/wav", "audio/mp3", "audio/m4a"]:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file format for {file.filename}"
-            )
+        task_id = secrets.token_hex(16)
+        progress_tracker.create_task(task_id)
+        task_ids.append(task_id)
+    
+    # Save and convert all files concurrently
+    file_paths = await asyncio.gather(
+        *[process_audio_file(file) for file in files],
+        return_exceptions=True
+    )
     
     responses = []
-    for file in files:
-        task_id = str(uuid.uuid4())
-        progress_tracker.create_task(task_id)
-        
+    for file, task_id, file_path in zip(files, task_ids, file_paths):
         try:
-            file_path = await process_audio_file(file)
-            background_tasks.add_task(
-                transcribe_and_analyze,
-                file_path,
-                db,
-                current_user.id,
-                task_id
-            )
+            if isinstance(file_path, Exception):
+                raise file_path
+            transcribe_and_analyze.delay(file_path, current_user.id, task_id)
             
             responses.append({
                 "message": f"File {file.filename} uploaded successfully",
                 "task_id": task_id
             })
-            task_ids.append(task_id)
         except Exception as e:
             progress_tracker.update_progress(task_id, 0, "error", str(e))
             responses.append({
@@ -122,7 +123,7 @@ async def upload_batch_audio(
                 "error": str(e)
             })
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_202_ACCEPTED,
         content=responses
     )
@@ -130,13 +131,13 @@ async def upload_batch_audio(
 @app.get("/progress/{task_id}")
 async def get_task_progress(
     task_id: str,
-    current_user = Depends(get_current_user)
+    username: str = Depends(get_current_username)
 ):
     """
     Get the progress of a specific task.
     """
     progress = progress_tracker.get_progress(task_id)
-    if "error" in progress:
+    if progress is None:
         raise HTTPException(status_code=404, detail="Task not found")
     return progress
 
@@ -178,6 +179,19 @@ async def get_conversation_stats(
 def read_root():
     return {"message": "Welcome to the Sales Conversation Analysis System!"}
 
+def write_export(write: Callable[[TextIO], None], suffix: str) -> str:
+    """
+    Write an export to a temporary file and return its path
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False, encoding="utf-8", newline="") as f:
+        try:
+            write(f)
+        except Exception:
+            f.close()
+            os.unlink(f.name)
+            raise
+    return f.name
+
 @app.get("/conversations/{conversation_id}/export")
 async def export_conversation(
     conversation_id: int,
@@ -201,7 +215,7 @@ async def export_conversation(
         raise HTTPException(status_code=400, detail="Unsupported format")
     
     if format == "json":
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "transcript": conversation.transcript,
                 "analysis": conversation.analysis,
@@ -212,101 +226,76 @@ async def export_conversation(
             }
         )
     elif format == "csv":
-        csv_content = "timestamp,speaker,text,phase,sentiment\n"
-        for segment in conversation.transcript["segments"]:
-            csv_content += f"{segment['start']:.2f},{segment['speaker']},\"{segment['text']}\","
-            classification = next(s["classification"] for s in conversation.analysis["segments"] 
-                              if s["start"] == segment["start"])
-            csv_content += f"{classification['phase']},{classification['sentiment']}\n"
+        transcript_segments = conversation.transcript["segments"]
+        # Keyed on rounded start times, both sides have been through a JSON round-trip
+        classification_by_start = {
+            round(segment["start"], 3): segment["classification"]
+            for segment in conversation.analysis["segments"]
+        }
+        
+        def write_csv(f: TextIO):
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["timestamp", "speaker", "text", "phase", "sentiment"])
+            for segment in transcript_segments:
+                classification = classification_by_start[round(segment["start"], 3)]
+                writer.writerow([
+                    f"{segment['start']:.2f}",
+                    segment["speaker"],
+                    segment["text"],
+                    classification["phase"],
+                    classification["sentiment"]
+                ])
         
-        return Response(
-            content=csv_content,
+        export_path = await run_in_threadpool(write_export, write_csv, ".csv")
+        return FileResponse(
+            export_path,
             media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=conversation_{conversation_id}.csv"
-            }
+            filename=f"conversation_{conversation_id}.csv",
+            background=BackgroundTask(os.unlink, export_path)
         )
     else:  # txt format
-        txt_content = f"Sales Conversation Analysis - ID: {conversation_id}\n"
-        txt_content += f"Date: {conversation.created_at}\n\n"
-        txt_content += "Transcript:\n"
-        for segment in conversation.transcript["segments"]:
-            txt_content += f"[{segment['start']:.2f}s] {segment['speaker']}: {segment['text']}\n"
-        
-        txt_content += "\nAnalysis:\n"
-        txt_content += f"Duration: {conversation.analysis['summary']['duration']:.2f}s\n"
-        txt_content += "\nPhase Distribution:\n"
-        for phase, duration in conversation.analysis["summary"]["phase_distribution"].items():
-            txt_content += f"- {phase}: {duration:.2f}s\n"
-        
-        txt_content += "\nSentiment Distribution:\n"
-        for sentiment, count in conversation.analysis["summary"]["sentiment_summary"].items():
-            txt_content += f"- {sentiment}: {count}\n"
-        
-        txt_content += "\nTurn Taking Analysis:\n"
+        created_at = conversation.created_at
+        transcript_segments = conversation.transcript["segments"]
+        summary = conversation.analysis["summary"]
         turn_analysis = conversation.analysis["turn_taking"]
-        txt_content += f"Total Turns: {turn_analysis['total_turns']}\n"
-        txt_content += f"Salesperson Turns: {turn_analysis['salesperson_stats']['total_turns']}\n"
-        txt_content += f"Customer Turns: {turn_analysis['customer_stats']['total_turns']}\n"
-        
-        return Response(
-            content=txt_content,
-            media_type="text/plain",
-            headers={
-                "Content-Disposition": f"attachment; filename=conversation_{conversation_id}.txt"
-            }
-        )
-
-async def transcribe_and_analyze(
-    file_path: str,
-    db: Session,
-    user_id: int,
-    task_id: str
-):
-    """
-    Background task to handle transcription and analysis
-    """
-    try:
-        # Update progress to converting stage
-        progress_tracker.update_progress(task_id, 1)
         
-        # Transcribe audio
-        progress_tracker.update_progress(task_id, 2)
-        transcript = await transcribe_audio(file_path)
-        
-        # Identify speakers
-        speakers = speaker_identifier.identify_speakers(transcript["segments"])
-        transcript["speakers"] = speakers
-        
-        # Analyze turn-taking patterns
-        turn_analysis = speaker_identifier.analyze_turn_taking(
-            speakers,
-            transcript["segments"]
-        )
-        
-        # Classify dialogue
-        progress_tracker.update_progress(task_id, 3)
-        analysis = await classify_dialogue(transcript)
-        analysis["turn_taking"] = turn_analysis
+        def generate_txt():
+            yield f"Sales Conversation Analysis - ID: {conversation_id}\n"
+            yield f"Date: {created_at}\n\n"
+            yield "Transcript:\n"
+            for segment in transcript_segments:
+                yield f"[{segment['start']:.2f}s] {segment['speaker']}: {segment['text']}\n"
+            
+            yield "\nAnalysis:\n"
+            yield f"Duration: {summary['duration']:.2f}s\n"
+            yield "\nPhase Distribution:\n"
+            for phase, duration in summary["phase_distribution"].items():
+                yield f"- {phase}: {duration:.2f}s\n"
+            
+            yield "\nSentiment Distribution:\n"
+            for sentiment, count in summary["sentiment_summary"].items():
+                yield f"- {sentiment}: {count}\n"
+            
+            yield "\nTurn Taking Analysis:\n"
+            yield f"Total Turns: {turn_analysis['total_turns']}\n"
+            yield f"Salesperson Turns: {turn_analysis['salesperson_stats']['total_turns']}\n"
+            yield f"Customer Turns: {turn_analysis['customer_stats']['total_turns']}\n"
         
-        # Store results
-        conversation = ConversationCreate(
-            user_id=user_id,
-            file_path=file_path,
-            transcript=transcript,
-            analysis=analysis
+        export_path = await run_in_threadpool(write_export, lambda f: f.writelines(generate_txt()), ".txt")
+        return FileResponse(
+            export_path,
+            media_type="text/plain",
+            filename=f"conversation_{conversation_id}.txt",
+            background=BackgroundTask(os.unlink, export_path)
         )
-        
-        db_conversation = Conversation(**conversation.dict())
-        db.add(db_conversation)
-        db.commit()
-        
-        # Mark task as completed
-        progress_tracker.update_progress(task_id, 4, "completed")
-        
-    except Exception as e:
-        progress_tracker.update_progress(task_id, -1, "error", str(e))
-        raise e
 
 if __name__ == "__main__":
-    uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Auto-reload only supports a single worker, so it is opt-in with DEV=1
+    reload = os.getenv("DEV") == "1"
+    uvicorn.run(
+        "src.main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=reload,
+        workers=None if reload else int(os.getenv("WEB_CONCURRENCY", os.cpu_count()))
+    )
\ No newline at end of file
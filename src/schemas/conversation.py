@@ -1,11 +1,13 @@
-from pydantic import BaseModel
-from typing import Dict, Optional
+from pydantic import BaseModel, ConfigDict
+from typing import Optional
 from datetime import datetime
 
 class ConversationBase(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     file_path: str
-    transcript: Optional[Dict] = None
-    analysis: Optional[Dict] = None
+    transcript: Optional[dict] = None
+    analysis: Optional[dict] = None
 
 class ConversationCreate(ConversationBase):
     user_id: int
@@ -15,5 +17,5 @@ class ConversationResponse(ConversationBase):
     user_id: int
     created_at: datetime
 
-    class Config:
-        orm_mode = True
\ No newline at end of file
+# Build the validators once at import instead of on first use
+ConversationResponse.model_rebuild()
\ No newline at end of file
@@ -1,5 +1,8 @@
 import os
+import wave
+import asyncio
 from pathlib import Path
+import aiofiles
 from pydub import AudioSegment
 from fastapi import UploadFile, HTTPException
 import uuid
@@ -7,6 +10,7 @@ import uuid
 UPLOAD_DIR = Path("uploads")
 ALLOWED_EXTENSIONS = {".wav", ".mp3", ".m4a"}
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+CHUNK_SIZE = 1024 * 1024  # 1MB
 
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -38,9 +42,9 @@ async def process_audio_file(file: UploadFile) -> str:
     
     # Save file
     try:
-        with open(file_path, "wb") as f:
-            while chunk := await file.read(8192):
-                f.write(chunk)
+        async with aiofiles.open(file_path, "wb") as f:
+            while chunk := await file.read(CHUNK_SIZE):
+                await f.write(chunk)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
     
@@ -48,11 +52,27 @@ async def process_audio_file(file: UploadFile) -> str:
     if ext != ".wav":
         wav_path = file_path.with_suffix(".wav")
         try:
-            audio = AudioSegment.from_file(file_path)
-            audio.export(wav_path, format="wav")
+            # Decoding is blocking, keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, convert_to_wav, file_path, wav_path
+            )
             os.remove(file_path)  # Remove original file
             file_path = wav_path
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error converting file: {str(e)}")
     
-    return str(file_path)
\ No newline at end of file
+    return str(file_path)
+
+def convert_to_wav(source_path: Path, wav_path: Path) -> None:
+    """
+    Convert an audio file to WAV
+    """
+    audio = AudioSegment.from_file(source_path)
+    audio.export(wav_path, format="wav")
+
+def get_audio_duration(file_path: str) -> float:
+    """
+    Return the duration in seconds of a processed (WAV) audio file
+    """
+    with wave.open(file_path, "rb") as audio:
+        return audio.getnframes() / audio.getframerate()
@@ -3,15 +3,16 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Optional
-from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+from cachetools.func import ttl_cache
 
-from src.models.database import get_db, User
+from src.models.database import SessionLocal, User
 
 # Security configuration
 SECRET_KEY = "your-secret-key"  # In production, use secure environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+USER_CACHE_TTL_SECONDS = 60
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -32,20 +33,44 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> Tuple[str, int]:
+    """
+    Validate a JWT and return its subject and expiry
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
-    user = db.query(User).filter(User.username == username).first()
+        raise _credentials_exception()
+    return username, payload.get("exp")
+
+@ttl_cache(maxsize=10_000, ttl=USER_CACHE_TTL_SECONDS)
+def _get_user(username: str, exp: int) -> Optional[User]:
+    """
+    Look up a user by username. Cached per token subject and expiry, so a
+    re-issued token is looked up again; entries live USER_CACHE_TTL_SECONDS.
+    """
+    with SessionLocal() as db:
+        return db.query(User).filter(User.username == username).first()
+
+async def get_current_username(token: str = Depends(oauth2_scheme)) -> str:
+    """
+    Authenticate a request from the token alone, without loading the user
+    """
+    username, _ = _decode_token(token)
+    return username
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    user = _get_user(*_decode_token(token))
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
\ No newline at end of file
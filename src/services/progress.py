@@ -1,83 +1,84 @@
-from typing import Dict
+from typing import Dict, Optional
 from datetime import datetime
-import asyncio
-from sqlalchemy.orm import Session
-import json
+import os
+import redis
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+TASK_TTL_SECONDS = int(os.getenv("TASK_CLEANUP_HOURS", 24)) * 3600
+
+STEP_DETAILS = {
+    0: "Uploading file",
+    1: "Converting audio",
+    2: "Transcribing",
+    3: "Analyzing"
+}
 
 class ProcessingProgress:
-    def __init__(self):
-        self.tasks = {}
+    """
+    Task progress stored in Redis hashes so every API worker and batch
+    consumer sees the same state. Entries expire TASK_TTL_SECONDS after
+    their last update.
+    """
+    
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+    
+    def _key(self, task_id: str) -> str:
+        return f"progress:{task_id}"
     
     def create_task(self, task_id: str, total_steps: int = 4) -> None:
         """
         Initialize a new processing task
         """
-        self.tasks[task_id] = {
-            "started_at": datetime.utcnow(),
+        key = self._key(task_id)
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={
+            "started_at": datetime.utcnow().isoformat(),
             "current_step": 0,
             "total_steps": total_steps,
             "status": "processing",
-            "step_details": {
-                0: "Uploading file",
-                1: "Converting audio",
-                2: "Transcribing",
-                3: "Analyzing"
-            },
-            "error": None
-        }
+            "error": ""
+        })
+        pipe.expire(key, TASK_TTL_SECONDS)
+        pipe.execute()
     
     def update_progress(self, task_id: str, step: int, status: str = "processing", error: str = None) -> None:
         """
         Update the progress of a task
         """
-        if task_id in self.tasks:
-            self.tasks[task_id].update({
-                "current_step": step,
-                "status": status,
-                "error": error
-            })
+        key = self._key(task_id)
+        if not self.redis.exists(key):
+            return
+        
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={
+            "current_step": step,
+            "status": status,
+            "error": error or ""
+        })
+        pipe.expire(key, TASK_TTL_SECONDS)
+        pipe.execute()
     
-    def get_progress(self, task_id: str) -> Dict:
+    def get_progress(self, task_id: str) -> Optional[Dict]:
         """
-        Get the current progress of a task
+        Get the current progress of a task, or None if it does not exist or has expired
         """
-        if task_id not in self.tasks:
-            return {"error": "Task not found"}
+        task = self.redis.hgetall(self._key(task_id))
+        if not task:
+            return None
         
-        task = self.tasks[task_id]
-        progress = (task["current_step"] / task["total_steps"]) * 100
+        current_step = int(task["current_step"])
+        progress = (current_step / int(task["total_steps"])) * 100
         
         return {
             "task_id": task_id,
             "progress": progress,
-            "current_step": task["current_step"],
-            "step_details": task["step_details"].get(task["current_step"]),
+            "current_step": current_step,
+            "step_details": STEP_DETAILS.get(current_step),
             "status": task["status"],
-            "error": task["error"],
-            "started_at": task["started_at"].isoformat()
+            "error": task["error"] or None,
+            "started_at": task["started_at"]
         }
-    
-    def clean_old_tasks(self, max_age_hours: int = 24) -> None:
-        """
-        Remove completed tasks older than specified hours
-        """
-        current_time = datetime.utcnow()
-        to_remove = []
-        
-        for task_id, task in self.tasks.items():
-            if task["status"] in ["completed", "error"]:
-                age = (current_time - task["started_at"]).total_seconds() / 3600
-                if age > max_age_hours:
-                    to_remove.append(task_id)
-        
-        for task_id in to_remove:
-            del self.tasks[task_id]
 
 # Global progress tracker instance
-progress_tracker = ProcessingProgress()
-
-# Background task to clean old tasks periodically
-async def clean_old_tasks_periodically():
-    while True:
-        progress_tracker.clean_old_tasks()
-        await asyncio.sleep(3600)  # Clean every hour
\ No newline at end of file
+progress_tracker = ProcessingProgress(redis.Redis.from_url(REDIS_URL, decode_responses=True))
\ No newline at end of file
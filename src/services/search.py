@@ -1,9 +1,8 @@
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from datetime import datetime
 
-from src.models.database import Conversation
+from src.models.database import Conversation, conversations_fts, has_search_index
 
 class SearchService:
     def __init__(self, db: Session):
@@ -24,12 +23,7 @@ class SearchService:
         query_obj = self.db.query(Conversation).filter(Conversation.user_id == user_id)
         
         if query:
-            query_obj = query_obj.filter(
-                or_(
-                    Conversation.transcript["text"].as_string().ilike(f"%{query}%"),
-                    Conversation.analysis["segments"].as_string().ilike(f"%{query}%")
-                )
-            )
+            query_obj = self._filter_text(query_obj, query)
         
         if start_date:
             query_obj = query_obj.filter(Conversation.created_at >= start_date)
@@ -49,6 +43,25 @@ class SearchService:
         
         return [conversation.to_dict() for conversation in query_obj.all()]
 
+    def _filter_text(self, query_obj, query: str):
+        """
+        Restrict a conversation query to transcripts containing the search text.
+        Every path matches the same case-insensitive substring of transcript.text;
+        the trigram search index only changes how it is found.
+        """
+        # Trigrams need at least three characters to match
+        if len(query) >= 3 and has_search_index():
+            phrase = '"' + query.replace('"', '""') + '"'
+            return query_obj.join(
+                conversations_fts,
+                conversations_fts.c.rowid == Conversation.id
+            ).filter(conversations_fts.c.text.match(phrase))
+        
+        # On Postgres this is served by the pg_trgm index on transcript ->> 'text'
+        return query_obj.filter(
+            Conversation.transcript["text"].as_string().ilike(f"%{query}%")
+        )
+    
     def get_conversation_stats(self, user_id: int) -> Dict:
         """
         Get aggregated statistics for user's conversations
@@ -1,33 +1,163 @@
-import whisper_timestamped as whisper
+import ctranslate2
 import torch
 import numpy as np
-from typing import Dict, List
+import asyncio
+import os
+from typing import Dict, List, Tuple
+
+# openai-whisper provides the log-mel front end and tokenizer; the model runs on CTranslate2
+from whisper.audio import load_audio, log_mel_spectrogram, pad_or_trim, N_SAMPLES, SAMPLE_RATE
+from whisper.tokenizer import get_tokenizer
+
+MAX_BATCH = 16
+MAX_WAIT_MS = 20
+# Batches in flight at once; bounds the GPU working set and lets pending windows form full batches
+ASR_MAX_CONCURRENCY = int(os.getenv("ASR_MAX_CONCURRENCY", 2))
+WINDOW_SECONDS = N_SAMPLES // SAMPLE_RATE
+TIME_PRECISION = 0.02  # seconds per Whisper timestamp token
+
+# CTranslate2 conversion of the Whisper model, see the README for the conversion step
+WHISPER_MODEL_PATH = os.getenv("WHISPER_MODEL_PATH", "whisper-base.en-ct2")
+# Defaults to int8 weights with FP16 activations on GPU and int8 on CPU
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE")
+
+def load_model() -> ctranslate2.models.Whisper:
+    """
+    Load the Whisper model; called once per worker process at startup
+    """
+    device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    compute_type = WHISPER_COMPUTE_TYPE or ("int8_float16" if device == "cuda" else "int8")
+    return ctranslate2.models.Whisper(
+        WHISPER_MODEL_PATH,
+        device=device,
+        compute_type=compute_type,
+        # Lets up to ASR_MAX_CONCURRENCY batches run through the model in parallel.
+        # Each replica decodes on its own CUDA stream, so concurrent batches
+        # interleave their kernels on one shared set of weights
+        inter_threads=ASR_MAX_CONCURRENCY
+    )
 
 class TranscriptionService:
-    def __init__(self):
-        self.model = whisper.load_model("base.en", device="cuda" if torch.cuda.is_available() else "cpu")
+    def __init__(self, model: ctranslate2.models.Whisper):
+        self.model = model
+        self.device = torch.device(model.device)
+        self.tokenizer = get_tokenizer(
+            self.model.is_multilingual,
+            num_languages=self.model.num_languages,
+            language="en",
+            task="transcribe"
+        )
+        # Start-of-transcript prompt; timestamp tokens stay enabled for segmentation
+        self.prompt = list(self.tokenizer.sot_sequence)
     
-    async def transcribe_audio(self, audio_path: str) -> Dict:
+    def load_audio(self, audio_path: str) -> torch.Tensor:
         """
-        Transcribe audio file using Whisper model and return timestamped transcript
+        Load an audio file into host memory; only the window being decoded
+        is moved to the model device
         """
-        # Load and transcribe audio
-        result = whisper.transcribe(
-            self.model,
-            audio_path,
-            language="en",
-            detect_speech_segments=True
-        )
+        return torch.from_numpy(load_audio(audio_path))
+    
+    def window_at(self, audio: torch.Tensor, seek: int) -> torch.Tensor:
+        """
+        Compute the log-mel spectrogram of the 30 second window starting at
+        sample `seek`. Whisper's encoder takes fixed-length input, so a window
+        running past the end of the audio is padded. The spectrogram is
+        computed on the model device so the batch never round-trips through
+        host memory before the forward pass.
+        """
+        chunk = pad_or_trim(audio[seek:seek + N_SAMPLES].to(self.device))
+        return log_mel_spectrogram(chunk, self.model.n_mels)
+    
+    def split_window(self, tokens: List[int], seek: int, num_samples: int) -> Tuple[List[Dict], int]:
+        """
+        Split the decoded tokens of the window at `seek` into segments and
+        return them with the sample the next window starts at
+        """
+        offset = seek / SAMPLE_RATE
+        segments, consumed = self._split_segments(tokens, offset)
         
-        # Process segments and identify speakers
-        processed_segments = self._process_segments(result["segments"])
+        # The padded tail of the last window can carry timestamps past the end of the audio
+        duration = num_samples / SAMPLE_RATE
+        for segment in segments:
+            segment["start"] = min(segment["start"], duration)
+            segment["end"] = min(segment["end"], duration)
+        
+        return segments, seek + round(consumed * SAMPLE_RATE)
+    
+    def decode_batch(self, mels: List[torch.Tensor]) -> List[List[int]]:
+        """
+        Decode a batch of log-mel windows in a single forward pass
+        """
+        batch = torch.stack(mels)
+        if self.device.type == "cuda":
+            # CTranslate2 reads the tensor directly from device memory on its own
+            # stream, so torch's queued spectrogram and stack kernels must finish first
+            torch.cuda.current_stream(self.device).synchronize()
         
+        # CUDA tensors are shared via __cuda_array_interface__, CPU tensors go through numpy
+        features = ctranslate2.StorageView.from_array(
+            batch if self.device.type == "cuda" else batch.numpy()
+        )
+        # sequences_ids leaves out the prompt tokens
+        results = self.model.generate(features, [self.prompt] * len(mels))
+        return [result.sequences_ids[0] for result in results]
+    
+    def build_transcript(self, segments: List[Dict]) -> Dict:
+        """
+        Assemble the segments of all windows of one audio file into a timestamped transcript
+        """
         return {
-            "segments": processed_segments,
-            "text": result["text"],
-            "language": result["language"]
+            "segments": self._process_segments(segments),
+            "text": "".join(segment["text"] for segment in segments),
+            "language": "en"
         }
     
+    def _split_segments(self, tokens: List[int], offset: float) -> Tuple[List[Dict], float]:
+        """
+        Split the decoded tokens of a window into segments at timestamp tokens
+        and return them with the number of seconds of the window they cover
+        """
+        timestamp_begin = self.tokenizer.timestamp_begin
+        segments = []
+        start = offset
+        text_tokens = []
+        
+        for token in tokens:
+            if token < timestamp_begin:
+                text_tokens.append(token)
+                continue
+            
+            time = offset + (token - timestamp_begin) * TIME_PRECISION
+            if text_tokens:
+                segments.append({
+                    "text": self.tokenizer.decode(text_tokens),
+                    "start": start,
+                    "end": time
+                })
+                text_tokens = []
+            start = time
+        
+        # As in Whisper's transcribe loop, only a single closing timestamp means
+        # the whole window was covered. After a timestamp pair the rest of the
+        # window is still to be decoded, and trailing text without a closing
+        # timestamp was cut off by the window boundary; either way drop what
+        # follows the last timestamp and decode again from there
+        single_timestamp_ending = (
+            len(tokens) >= 2 and tokens[-1] >= timestamp_begin and tokens[-2] < timestamp_begin
+        )
+        if not single_timestamp_ending and start > offset:
+            return segments, start - offset
+        
+        # No timestamp to resume from, so the text covers the whole window
+        if text_tokens:
+            segments.append({
+                "text": self.tokenizer.decode(text_tokens),
+                "start": start,
+                "end": offset + WINDOW_SECONDS
+            })
+        
+        return segments, WINDOW_SECONDS
+    
     def _process_segments(self, segments: List) -> List[Dict]:
         """
         Process transcript segments and identify speakers
@@ -54,10 +184,113 @@ class TranscriptionService:
         # For now, returns placeholder
         return "Unknown"
 
-transcription_service = TranscriptionService()
+class BatchingTranscriber:
+    """
+    Coalesces concurrent transcription requests into batched model calls.
+    Each audio file is decoded one 30 second window at a time, the next
+    window starting where the previous one's last complete segment ended;
+    a single drain task collects up to max_batch windows from all in-flight
+    files (waiting at most max_wait_ms for the batch to fill) and decodes
+    them in one forward pass. At most max_concurrency batches are in flight
+    at once.
+    """
+    
+    def __init__(
+        self,
+        service: TranscriptionService,
+        max_batch: int = MAX_BATCH,
+        max_wait_ms: int = MAX_WAIT_MS,
+        max_concurrency: int = ASR_MAX_CONCURRENCY
+    ):
+        self.service = service
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+        self.queue = None
+        self.asr_semaphore = None
+        self._drain_task = None
+        self._batches = set()
+    
+    def start(self) -> None:
+        """
+        Start the drain task on the running event loop
+        """
+        self.queue = asyncio.Queue()
+        self.asr_semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._drain_task = asyncio.create_task(self._drain())
+    
+    async def submit(self, audio_path: str) -> Dict:
+        """
+        Transcribe an audio file, sharing model batches with other in-flight requests
+        """
+        loop = asyncio.get_running_loop()
+        audio = await loop.run_in_executor(None, self.service.load_audio, audio_path)
+        
+        segments = []
+        seek = 0
+        while True:
+            mel = await loop.run_in_executor(None, self.service.window_at, audio, seek)
+            future = loop.create_future()
+            await self.queue.put((mel, future))
+            tokens = await future
+            
+            window_segments, seek = self.service.split_window(tokens, seek, len(audio))
+            segments.extend(window_segments)
+            if seek >= len(audio):
+                return self.service.build_transcript(segments)
+    
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free slot before forming the batch so windows keep
+            # accumulating while the GPU is busy; released in _run_batch
+            await self.asr_semaphore.acquire()
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Dispatch without waiting so consecutive batches overlap on the GPU
+            batch = asyncio.create_task(self._run_batch(items))
+            self._batches.add(batch)
+            batch.add_done_callback(self._batches.discard)
+    
+    async def _run_batch(self, items: List) -> None:
+        loop = asyncio.get_running_loop()
+        mels = [mel for mel, _ in items]
+        try:
+            results = await loop.run_in_executor(None, self.service.decode_batch, mels)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.asr_semaphore.release()
+        
+        for (_, future), tokens in zip(items, results):
+            if not future.done():
+                future.set_result(tokens)
 
-async def transcribe_audio(audio_path: str) -> Dict:
+async def transcribe_audio(audio_path: str, transcriber: BatchingTranscriber) -> Dict:
     """
     Wrapper function for transcription service
     """
-    return await transcription_service.transcribe_audio(audio_path)
\ No newline at end of file
+    return await transcriber.submit(audio_path)
+
+async def transcribe_audio_batch(audio_paths: List[str], transcriber: BatchingTranscriber) -> List:
+    """
+    Transcribe several audio files through the shared batches.
+    Files that fail are returned as the raised exception so one bad
+    upload does not discard the rest of the batch.
+    """
+    return await asyncio.gather(
+        *[transcriber.submit(audio_path) for audio_path in audio_paths],
+        return_exceptions=True
+    )
@@ -0,0 +1,30 @@
+import json
+
+import redis
+from celery import Celery
+
+from .services.audio_processing import get_audio_duration
+from .services.progress import REDIS_URL, progress_tracker
+
+PENDING_QUEUE = "asr:pending"
+
+celery_app = Celery("asr", broker=REDIS_URL)
+redis_client = redis.Redis.from_url(REDIS_URL)
+
+@celery_app.task(name="asr.transcribe_and_analyze")
+def transcribe_and_analyze(file_path: str, user_id: int, task_id: str):
+    """
+    Queue an uploaded file for batched transcription and analysis.
+    The file is picked up by the batch consumer in src/worker.py.
+    """
+    try:
+        job = {
+            "file_path": file_path,
+            "user_id": user_id,
+            "task_id": task_id,
+            "duration": get_audio_duration(file_path)
+        }
+        redis_client.lpush(PENDING_QUEUE, json.dumps(job))
+    except Exception as e:
+        progress_tracker.update_progress(task_id, -1, "error", str(e))
+        raise
@@ -0,0 +1,188 @@
+import asyncio
+import bisect
+import json
+import os
+from types import SimpleNamespace
+from typing import Dict, List
+
+import redis.asyncio as redis
+
+from .models.database import SessionLocal, Conversation
+from .services.transcription import (
+    BatchingTranscriber,
+    TranscriptionService,
+    load_model,
+    transcribe_audio_batch
+)
+from .services.classification import DialogueClassifier
+from .services.speaker_identification import SpeakerIdentifier
+from .services.progress import progress_tracker
+from .schemas.conversation import ConversationCreate
+from .tasks import REDIS_URL, PENDING_QUEUE
+
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", 16))
+BATCH_WINDOW_SECONDS = 0.05
+# Batches transcribed at once; keeps the transcriber fed with windows from many uploads
+MAX_INFLIGHT_BATCHES = int(os.getenv("MAX_INFLIGHT_BATCHES", 4))
+# Upper bounds (seconds) of the duration buckets; audio of similar length is transcribed together
+DURATION_BUCKETS = (30, 120, 600)
+
+# Per-process resources, built in startup() rather than at import time
+state = SimpleNamespace()
+
+def startup() -> None:
+    """
+    Load the models owned by this worker process; they are shared by all of its tasks
+    """
+    state.speaker_identifier = SpeakerIdentifier()
+    state.classifier = DialogueClassifier()
+    state.transcriber = BatchingTranscriber(TranscriptionService(load_model()))
+    state.transcriber.start()
+
+async def pop_pending_jobs(client) -> List[Dict]:
+    """
+    Block until a job is pending, then collect up to BATCH_SIZE jobs
+    arriving within BATCH_WINDOW_SECONDS
+    """
+    _, raw_job = await client.brpop(PENDING_QUEUE)
+    jobs = [json.loads(raw_job)]
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BATCH_WINDOW_SECONDS
+    while len(jobs) < BATCH_SIZE:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        item = await client.brpop(PENDING_QUEUE, timeout=remaining)
+        if item is None:
+            break
+        jobs.append(json.loads(item[1]))
+    
+    return jobs
+
+def bucketize(jobs: List[Dict]) -> List[List[Dict]]:
+    """
+    Group jobs by audio duration so each batch holds similar-length files
+    """
+    buckets = {}
+    for job in sorted(jobs, key=lambda j: j["duration"]):
+        bucket = bisect.bisect_left(DURATION_BUCKETS, job["duration"])
+        buckets.setdefault(bucket, []).append(job)
+    return list(buckets.values())
+
+async def analyze(job: Dict, transcript: Dict) -> Dict:
+    """
+    Run speaker identification and classification on a transcript and
+    return the conversation row to store
+    """
+    # Identify speakers
+    speakers = state.speaker_identifier.identify_speakers(transcript["segments"])
+    transcript["speakers"] = speakers
+    
+    # Analyze turn-taking patterns
+    turn_analysis = state.speaker_identifier.analyze_turn_taking(
+        speakers,
+        transcript["segments"]
+    )
+    
+    # Classify dialogue
+    progress_tracker.update_progress(job["task_id"], 3)
+    analysis = await state.classifier.classify_dialogue(transcript)
+    analysis["turn_taking"] = turn_analysis
+    
+    conversation = ConversationCreate(
+        user_id=job["user_id"],
+        file_path=job["file_path"],
+        transcript=transcript,
+        analysis=analysis
+    )
+    return conversation.model_dump()
+
+def fail_jobs(jobs: List[Dict], error: Exception) -> None:
+    """
+    Mark every job in a batch as failed
+    """
+    for job in jobs:
+        progress_tracker.update_progress(job["task_id"], -1, "error", str(error))
+
+def store_conversations(rows: List[Dict]) -> None:
+    """
+    Insert the conversations of a batch in a single transaction
+    """
+    with SessionLocal() as db:
+        db.bulk_insert_mappings(Conversation, rows)
+        db.commit()
+
+async def process_batch(jobs: List[Dict]) -> None:
+    """
+    Transcribe a bucket of jobs in one batch, analyze each result and
+    store the batch with one commit
+    """
+    for job in jobs:
+        progress_tracker.update_progress(job["task_id"], 2)
+    
+    transcripts = await transcribe_audio_batch(
+        [job["file_path"] for job in jobs],
+        state.transcriber
+    )
+    
+    analyzed_jobs = []
+    rows = []
+    for job, transcript in zip(jobs, transcripts):
+        try:
+            if isinstance(transcript, Exception):
+                raise transcript
+            rows.append(await analyze(job, transcript))
+            analyzed_jobs.append(job)
+        except Exception as e:
+            progress_tracker.update_progress(job["task_id"], -1, "error", str(e))
+    
+    if not rows:
+        return
+    
+    # Store results off the event loop so the transcriber keeps draining
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, store_conversations, rows)
+    except Exception as e:
+        fail_jobs(analyzed_jobs, e)
+        return
+    
+    # Mark tasks as completed
+    for job in analyzed_jobs:
+        progress_tracker.update_progress(job["task_id"], 4, "completed")
+
+async def run_batch(jobs: List[Dict], inflight: asyncio.Semaphore) -> None:
+    """
+    Process a batch and free its slot; the jobs are already off the Redis
+    list, so a failing batch is reported instead of stopping the consumer
+    """
+    try:
+        await process_batch(jobs)
+    except Exception as e:
+        fail_jobs(jobs, e)
+    finally:
+        inflight.release()
+
+async def consume_pending():
+    """
+    Long-running loop pulling pending jobs off Redis and transcribing them in batches.
+    Up to MAX_INFLIGHT_BATCHES batches run at once, and popping continues
+    while they transcribe.
+    """
+    client = redis.from_url(REDIS_URL)
+    startup()
+    inflight = asyncio.Semaphore(MAX_INFLIGHT_BATCHES)
+    batches = set()
+    while True:
+        jobs = await pop_pending_jobs(client)
+        for job in jobs:
+            progress_tracker.update_progress(job["task_id"], 1)
+        for bucket in bucketize(jobs):
+            # Blocks popping while every slot is busy
+            await inflight.acquire()
+            batch = asyncio.create_task(run_batch(bucket, inflight))
+            batches.add(batch)
+            batch.add_done_callback(batches.discard)
+
+if __name__ == "__main__":
+    asyncio.run(consume_pending())
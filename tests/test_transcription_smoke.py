@@ -0,0 +1,45 @@
+"""
+Smoke test running one real CTranslate2 decode, so a model call the pinned
+ctranslate2 rejects fails the suite instead of every upload.
+
+Set WHISPER_SMOKE_MODEL to a converted model directory to skip the conversion;
+otherwise openai/whisper-tiny.en is converted once per session (needs transformers).
+"""
+import os
+
+import pytest
+
+ctranslate2 = pytest.importorskip("ctranslate2")
+torch = pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+from src.services.transcription import SAMPLE_RATE, TranscriptionService
+
+@pytest.fixture(scope="session")
+def model_path(tmp_path_factory):
+    path = os.getenv("WHISPER_SMOKE_MODEL")
+    if path:
+        return path
+    pytest.importorskip("transformers")
+    output_dir = tmp_path_factory.mktemp("whisper-tiny.en-ct2")
+    converter = ctranslate2.converters.TransformersConverter("openai/whisper-tiny.en")
+    return converter.convert(str(output_dir), quantization="int8", force=True)
+
+@pytest.fixture(scope="session")
+def service(model_path):
+    model = ctranslate2.models.Whisper(model_path, device="cpu", compute_type="int8")
+    return TranscriptionService(model)
+
+def test_decode_batch(service):
+    audio = torch.zeros(SAMPLE_RATE * 2)
+    mel = service.window_at(audio, 0)
+    
+    window_tokens = service.decode_batch([mel, mel])
+    
+    assert len(window_tokens) == 2
+    # The prompt is not part of the decoded sequence
+    assert window_tokens[0][:len(service.prompt)] != service.prompt
+    
+    segments, seek = service.split_window(window_tokens[0], 0, len(audio))
+    assert seek > 0
+    assert all(segment["end"] <= 2 for segment in segments)